@@ -9,6 +9,7 @@ MOTIS is recommended for support of public transit.
 
 from pulp import *
 
+import numpy as np
 import itertools
 import math
 from tqdm import tqdm
@@ -18,8 +19,14 @@ import os
 import csv
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict, namedtuple
 
-from travel_times import InterfaceTravelTimeEngine
+from travel_times import (
+    InterfaceTravelTimeEngine,
+    haversine_matrix,
+    WALKING_MINUTES_PER_KM,
+)
 from travel_times.motis import MotisTravelTimeEngine
 
 if __name__ != "__main__":
@@ -161,6 +168,13 @@ parser.add_argument(
 
 parser.add_argument("--afterparty", help="Address of the Afterparty")
 
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=16,
+    help="Number of parallel route requests to self-hosted travel time backends",
+)
+
 
 parser.add_argument(
     "file",
@@ -185,8 +199,14 @@ courses = list(range(0, args.num_courses))
 datetimes = {0: args.datetime_1, 1: args.datetime_2, 2: args.datetime_3}
 
 
-travel_time_engine: InterfaceTravelTimeEngine = MotisTravelTimeEngine()
+travel_time_engine: InterfaceTravelTimeEngine = MotisTravelTimeEngine(
+    workers=args.workers
+)
+
 
+# prefs holds one score per course, empty when preferences are ignored
+# geo is filled in after geocoding
+Team = namedtuple("Team", "name addr tel diet prefs idx geo")
 
 data = []
 with open(args.file, newline="") as csvfile:
@@ -210,18 +230,10 @@ with open(args.file, newline="") as csvfile:
 
     for row in csvr:
         if args.ignore_preferences:
-            data.append({"name": row[0], "addr": row[1], "tel": row[2], "diet": row[3]})
+            prefs = ()
         else:
-            d = {
-                "name": row[0],
-                "addr": row[1],
-                "tel": row[2],
-                "diet": row[3],
-            }
-            for c in courses:
-                d[f"pref{c + 1}"] = float(row[4 + c])
-
-            data.append(d)
+            prefs = tuple(float(row[4 + c]) for c in courses)
+        data.append(Team(row[0], row[1], row[2], row[3], prefs, len(data), None))
 
 
 if len(data) % len(courses) != 0:
@@ -230,23 +242,46 @@ if len(data) % len(courses) != 0:
     )
     exit(1)
 
+# preferences per (team, course), a score of <= -1000 forbids cooking that course
+if args.ignore_preferences:
+    pref = np.zeros((len(data), len(courses)))
+else:
+    pref = np.array([t.prefs for t in data])
+forbidden = pref <= -1000
+
 
 distance_matrix = {}
 
-# set indexes for easy access
-for idx in range(len(data)):
-    data[idx]["idx"] = idx
-
 # team_name, adresse, perf1, pref2, pref3
 
+# route requests are I/O bound, run them in parallel if the engine allows it
+# the rate limiters only hold for serial calls, so everything else stays serial
+executor = ThreadPoolExecutor(
+    max_workers=args.workers if travel_time_engine.parallel_routing else 1
+)
+
+
+def cancel_pending(futures):
+    """Drops requests that have not started, so a failure exits right away"""
+    for future in futures:
+        future.cancel()
+
+
 print(f"Geocoding of adresses using {travel_time_engine.name()} API:")
-for i in tqdm(data, unit="address"):
-    data[i["idx"]]["geo"] = travel_time_engine.get_geo(i["addr"])
+# geocoding uses the public OSM / Hafas APIs, one request at a time
+data = [
+    t._replace(geo=travel_time_engine.get_geo(t.addr))
+    for t in tqdm(data, unit="address")
+]
 
 if args.afterparty is not None:
     afterparty_geo = travel_time_engine.get_geo(args.afterparty)
 print()
 
+# direct distances in km between all teams
+positions = np.array([travel_time_engine.position(t.geo) for t in data])
+direct_distances = haversine_matrix(positions[:, 0], positions[:, 1])
+
 
 print(f"Getting distances using {travel_time_engine.name()} API:")
 # made assumption that distance matrix is symetric
@@ -256,107 +291,227 @@ pair_function = (
 )
 pairs = list(pair_function(data, 2))
 
+
+def store_route(a, b, c, route_time):
+    distance_matrix[(a.idx, b.idx, c)] = route_time
+
+    if not args.asymetric_distances:
+        distance_matrix[(b.idx, a.idx, c)] = route_time
+
+
 count_distance_matrix = len(pairs)
-for a, b in tqdm(pairs, unit="route"):
-    for c in courses:
-        try:
-            route_time = travel_time_engine.route_between_points(
-                a["geo"], b["geo"], time=datetimes[c]
-            )
-            distance_matrix[(a["idx"], b["idx"], c)] = route_time
+if hasattr(travel_time_engine, "route_matrix"):
+    # engine can return the whole matrix with one request per course
+    for c in tqdm(courses, unit="course"):
+        matrix = travel_time_engine.route_matrix(
+            [t.geo for t in data], time=datetimes[c]
+        )
+        for a, b in pairs:
+            store_route(a, b, c, matrix[a.idx][b.idx])
+else:
+    futures = {}
+    for a, b in pairs:
+        direct_distance = direct_distances[a.idx, b.idx]
+        for c in courses:
+            if direct_distance < travel_time_engine.walking_distance:
+                # short route, estimate as walk instead of requesting it
+                store_route(a, b, c, float(direct_distance) * WALKING_MINUTES_PER_KM)
+            else:
+                future = executor.submit(
+                    travel_time_engine.route_between_points,
+                    a.geo,
+                    b.geo,
+                    time=datetimes[c],
+                )
+                futures[future] = (a, b, c)
 
-            if not args.asymetric_distances:
-                distance_matrix[(b["idx"], a["idx"], c)] = route_time
+    try:
+        for future in tqdm(as_completed(futures), total=len(futures), unit="route"):
+            a, b, c = futures[future]
+            try:
+                route_time = future.result()
+            except Exception as ex:
+                print(a.addr, " to ", b.addr)
+                raise ex
 
-        except Exception as ex:
-            print(a["geo"].name, " to ", b["geo"].name, "; direct at ", direct_distance)
-            raise ex
+            store_route(a, b, c, route_time)
+    finally:
+        cancel_pending(futures)
 
 
 print()
 
 print("Getting distances to Afterparty")
-for t in tqdm(range(len(data))):
+for t in range(len(data)):
     for c in courses:
         distance_matrix[(t, t, c)] = 0
 
-    if args.afterparty is not None:
-        dist = travel_time_engine.route_between_points(
-            data[t]["geo"], afterparty_geo, time=args.datetime_afterparty
+if args.afterparty is not None:
+    afterparty_futures = [
+        executor.submit(
+            travel_time_engine.route_between_points,
+            t.geo,
+            afterparty_geo,
+            time=args.datetime_afterparty,
         )
-    else:
-        dist = 0
+        for t in data
+    ]
+    try:
+        dists = [future.result() for future in tqdm(afterparty_futures)]
+    finally:
+        cancel_pending(afterparty_futures)
+else:
+    dists = [0] * len(data)
+for t, dist in enumerate(dists):
     distance_matrix[(t, "afterparty")] = dist
 
+executor.shutdown()
 print()
 
 # find teams at same adress:
 
 same_addr_team = {}
 for t in data:
-    if t["addr"] not in same_addr_team:
-        same_addr_team[t["addr"]] = [t]
+    if t.addr not in same_addr_team:
+        same_addr_team[t.addr] = [t]
     else:
-        same_addr_team[t["addr"]].append(t)
+        same_addr_team[t.addr].append(t)
 
 
 # everything is ready for the optimisation!
 print("Creating Optimization Model")
 groups = range(int(len(data) / len(courses)))
 teams = range(len(data))
+# all other teams, used to skip self-loops when iterating arcs
+other_teams = [[j for j in teams if j != i] for i in teams]
+
+# travel times as arrays: D[c, i, j] between teams, A[j] from team j to the afterparty
+D = np.array(
+    [[[distance_matrix[(i, j, c)] for j in teams] for i in teams] for c in courses],
+    dtype=float,
+)
+A = np.array([distance_matrix[(t, "afterparty")] for t in teams], dtype=float)
+
+# travel time of an arc, the last course includes the way to the afterparty
+arc_duration = D.copy()
+arc_duration[courses[-1]] += A[None, :]
+
+# nested lists are the fastest to index from the generators below
+travel = D.tolist()
+arc_duration = arc_duration.tolist()
+
+# (c, i, j) of routes that take time, zero terms are left out of the sums below
+timed_travel = [
+    (c, i, j)
+    for c in courses
+    for i in teams
+    for j in other_teams[i]
+    if travel[c][i][j] > 0
+]
+timed_arc_duration = [
+    (c, i, j)
+    for c in courses
+    for i in teams
+    for j in other_teams[i]
+    if arc_duration[c][i][j] > 0
+]
 
 prob = LpProblem("AssignmentProblem", LpMinimize)
 
-assignment = LpVariable.dicts(
+
+def binary_array(name, shape, keys):
+    """
+    Binary variables in an object array of the given shape,
+    indexed by integers instead of hashing tuple keys. Entries not in keys stay None.
+    """
+    variables = np.full(shape, None, dtype=object)
+    for key in keys:
+        variables[key] = LpVariable(
+            name + "_" + "_".join(map(str, key)), 0, 1, LpBinary
+        )
+    return variables
+
+
+assignment = binary_array(
     "assignment",
+    (len(teams), len(groups), len(courses)),
     ((t, g, c) for t in teams for g in groups for c in courses),
-    0,
-    1,
-    LpBinary,
 )
-chef = LpVariable.dicts(
-    "chef", ((t, g, c) for t in teams for g in groups for c in courses), 0, 1, LpBinary
+chef = binary_array(
+    "chef",
+    (len(teams), len(groups), len(courses)),
+    ((t, g, c) for t in teams for g in groups for c in courses),
 )
 
-# route between i and j for team t in group g and course c
-arc = LpVariable.dicts(
-    "arc",
-    (
-        (c, i, j, t, g)
-        for c in courses
-        for i in teams
-        for j in teams
-        for t in teams
-        for g in groups
-    ),
-    0,
-    1,
-    LpBinary,
+
+def can_travel(c, i, j):
+    """false for routes no team can take, their arcs are not created"""
+    if i == j:
+        # later courses always change the location
+        return c == courses[0]
+    # forbid any arc with a travel time of <= 1
+    return args.can_stay or travel[c][i][j] > 1
+
+
+# team t eats at chef j in group g and course c
+# the first course starts at home, so this is also the route of that course
+visit_keys = [
+    (t, g, c, j)
+    for t in teams
+    for g in groups
+    for c in courses
+    for j in teams
+    if c != courses[0] or can_travel(c, t, j)
+]
+visit = binary_array(
+    "visit", (len(teams), len(groups), len(courses), len(teams)), visit_keys
 )
 
+# route between i and j for team t in the later courses c
+# the group is implied by assignment, so it is not part of the index
+arc_keys = [
+    (c, i, j, t)
+    for c in courses[1:]
+    for t in teams
+    for i in teams
+    for j in teams
+    if can_travel(c, i, j)
+]
+arc = binary_array("arc", (len(courses), len(teams), len(teams), len(teams)), arc_keys)
+
+
+def travel_terms(t, duration, timed):
+    """
+    (variable, duration) terms for the routes of team t.
+    Routes of the first course are derived from visit,
+    later ones are arcs.
+    """
+    for c, i, j in timed:
+        if c == courses[0]:
+            if i == t:
+                for g in groups:
+                    if visit[(t, g, c, j)] is not None:
+                        yield (visit[(t, g, c, j)], duration[c][i][j])
+        elif arc[(c, i, j, t)] is not None:
+            yield (arc[(c, i, j, t)], duration[c][i][j])
+
 
 maxDuration = LpVariable("maxDuration", lowBound=0)
 
 
-max_pref = (
-    0
-    if args.ignore_preferences
-    else max([data[t][f"pref{c + 1}"] for t in teams for c in courses])
-)
+max_pref = 0 if args.ignore_preferences else pref.max()
 
 
 preferences = (
     0
     if args.ignore_preferences
     else (
-        lpSum(
-            [
-                chef[(t, g, c)] * data[t][f"pref{c + 1}"] / max_pref
-                for t in teams
-                for g in groups
-                for c in courses
-                if data[t][f"pref{c + 1}"] > -1000
-            ]
+        LpAffineExpression(
+            (chef[(t, g, c)], pref[t, c] / max_pref)
+            for t in teams
+            for g in groups
+            for c in courses
+            if not forbidden[t, c]
         )
     )
 )
@@ -365,20 +520,10 @@ preferences = (
 distance_sum = (
     0
     if args.ignore_avg_dist
-    else lpSum(
-        [
-            arc[(c, i, j, t, g)]
-            * (
-                (distance_matrix[(j, "afterparty")] if c == courses[-1] else 0)
-                + distance_matrix[(i, j, c)]
-            )
-            for t in teams
-            for c in courses
-            for i in teams
-            for j in teams
-            for g in groups
-            if j is not i
-        ]
+    else LpAffineExpression(
+        term
+        for t in teams
+        for term in travel_terms(t, arc_duration, timed_arc_duration)
     )
 )
 
@@ -392,105 +537,112 @@ prob += (
 # Assign every team to one group per course
 for t in teams:
     for c in courses:
-        prob += lpSum([assignment[(t, g, c)] for g in groups]) == 1
+        prob += LpAffineExpression((assignment[(t, g, c)], 1) for g in groups) == 1
 
 # evey group and team has one member for every course
+# and every group must have one chef per course
 for g in groups:
     for c in courses:
-        prob += lpSum([assignment[(t, g, c)] for t in teams]) == len(courses)
+        prob += LpAffineExpression((v, 1) for v in assignment[:, g, c]) == len(courses)
+        prob += LpAffineExpression((v, 1) for v in chef[:, g, c]) == 1
+
+
+def meet_pairs(n_teams, n_groups, n_courses):
+    """
+    All (t1, t2, g1, g2, c1, c2) index rows with t1 < t2 and c1 < c2,
+    in the order of the nested loops they replace
+    """
+    t1, t2 = np.triu_indices(n_teams, k=1)
+    c1, c2 = np.triu_indices(n_courses, k=1)
+    g1, g2 = np.divmod(np.arange(n_groups * n_groups), n_groups)
+
+    ci, gi, ti = (
+        idx.ravel()
+        for idx in np.meshgrid(
+            np.arange(len(c1)), np.arange(len(g1)), np.arange(len(t1)), indexing="ij"
+        )
+    )
+    meetings = np.column_stack((t1[ti], t2[ti], g1[gi], g2[gi], c1[ci], c2[ci]))
+    return meetings.astype(np.int32)
 
 
 # teams can only meet once
 if not args.can_meet_again:
     print("Ensuring that teams meet only once ...")
-    for c1 in range(len(courses)):
-        for c2 in range(c1 + 1, len(courses)):
-            for g1 in groups:
-                for g2 in groups:
-                    for t1 in range(len(teams)):
-                        for t2 in range(t1 + 1, len(teams)):
-                            prob += (
-                                assignment[(teams[t1], g1, courses[c1])]
-                                + assignment[(teams[t2], g1, courses[c1])]
-                                + assignment[(teams[t1], g2, courses[c2])]
-                                + assignment[(teams[t2], g2, courses[c2])]
-                                <= 3
-                            )
+    # tolist() gives plain ints, which hash faster than numpy scalars
+    for t1, t2, g1, g2, c1, c2 in meet_pairs(
+        len(teams), len(groups), len(courses)
+    ).tolist():
+        prob += (
+            assignment[(teams[t1], g1, courses[c1])]
+            + assignment[(teams[t2], g1, courses[c1])]
+            + assignment[(teams[t1], g2, courses[c2])]
+            + assignment[(teams[t2], g2, courses[c2])]
+            <= 3
+        )
 
 
 # temp fix no chef
 if not args.ignore_preferences:
     for t in teams:
         for c in courses:
-            if data[t][f"pref{c + 1}"] <= -1000:
-                print(f"Forbidding {c + 1}. course for", data[t]["name"])
+            if forbidden[t, c]:
+                print(f"Forbidding {c + 1}. course for", data[t].name)
                 for g in groups:
                     prob += chef[(t, g, c)] == 0
 
 
-# every group must have one chef per course
-for g in groups:
-    for c in courses:
-        prob += lpSum([chef[(t, g, c)] for t in teams]) == 1
-
-
 # every team is chef at most one
 for t in teams:
-    prob += lpSum([chef[(t, g, c)] for g in groups for c in courses]) == 1
+    prob += (
+        LpAffineExpression((chef[(t, g, c)], 1) for g in groups for c in courses) == 1
+    )
 
 
-# only be chef if assigned
 for t in teams:
     for g in groups:
         for c in courses:
+            # only be chef if assigned
             prob += chef[(t, g, c)] <= assignment[(t, g, c)]
 
-
-# only have arc when assigned
-for t in teams:
-    for g in groups:
-        for c in courses:
+            # visit exactly one chef when assigned
             prob += (
-                lpSum([arc[(c, i, j, t, g)] for i in teams for j in teams])
-                == assignment[t, g, c]
+                LpAffineExpression((v, 1) for v in visit[t, g, c] if v is not None)
+                == assignment[(t, g, c)]
             )
 
+            # go only to chef
+            for j in teams:
+                if visit[(t, g, c, j)] is not None:
+                    prob += visit[(t, g, c, j)] <= chef[(j, g, c)]
+
+
 # cant have more than one team moving between source and target for a course
 # for c in courses:
 #    for source in teams:
 #        for target in teams:
-#            prob += lpSum([  arc[ (c, source,target, t, g)] for t in teams for g in groups ]) <= 1
-
-
-# start at self if assigned
-for t in teams:
-    for g in groups:
-        prob += (
-            lpSum([arc[(courses[0], t, j, t, g)] for j in teams])
-            == assignment[(t, g, courses[0])]
-        )
+#            prob += lpSum([  arc[ (c, source,target, t)] for t in teams ]) <= 1
 
-# go only to chef
-for c in courses:
+# arc ends at the visited chef
+for c in courses[1:]:
     for t in teams:
-        for g in groups:
-            for i in teams:
-                for j in teams:
-                    prob += arc[(c, i, j, t, g)] <= chef[(j, g, c)]
+        for j in teams:
+            prob += LpAffineExpression(
+                (arc[(c, i, j, t)], 1) for i in teams if arc[(c, i, j, t)] is not None
+            ) == LpAffineExpression((visit[(t, g, c, j)], 1) for g in groups)
 
 # can only leave if entering
 for c in range(1, len(courses)):
     for t in teams:
         for i in teams:
-            prob += lpSum(
-                [
-                    arc[(courses[c], i, j, t, g)]
-                    for j in teams
-                    for g in groups
-                    if j is not i
-                ]
-            ) == lpSum(
-                [arc[(courses[c - 1], r, i, t, g)] for r in teams for g in groups]
+            prob += LpAffineExpression(
+                (arc[(courses[c], i, j, t)], 1)
+                for j in other_teams[i]
+                if arc[(courses[c], i, j, t)] is not None
+            ) == LpAffineExpression(
+                (visit[(t, g, courses[c - 1], i)], 1)
+                for g in groups
+                if visit[(t, g, courses[c - 1], i)] is not None
             )
 
 
@@ -498,51 +650,14 @@ for c in range(1, len(courses)):
 if not args.ignore_max_dist:
     for t in teams:
         prob += (
-            lpSum(
-                [
-                    arc[(c, i, j, t, g)]
-                    * (
-                        (distance_matrix[(j, "afterparty")] if c == courses[-1] else 0)
-                        + distance_matrix[(i, j, c)]
-                    )
-                    for c in courses
-                    for i in teams
-                    for j in teams
-                    for g in groups
-                    if j is not i
-                ]
-            )
+            LpAffineExpression(travel_terms(t, arc_duration, timed_arc_duration))
             <= maxDuration
         )
 
 
 # have minimum time constraint
 for t in teams:
-    prob += (
-        lpSum(
-            [
-                arc[(c, i, j, t, g)] * (distance_matrix[(i, j, c)])
-                for c in courses
-                for i in teams
-                for j in teams
-                for g in groups
-                if j is not i
-            ]
-        )
-        >= args.min_travel
-    )
-
-
-# forbid any arc with a travel time of <= 1
-if not args.can_stay:
-    for t in teams:
-        for c in courses:
-            for g in groups:
-                for j in teams:
-                    for i in teams:
-                        if i is not j:
-                            if distance_matrix[(i, j, c)] <= 1:
-                                prob += arc[(c, i, j, t, g)] == 0
+    prob += LpAffineExpression(travel_terms(t, travel, timed_travel)) >= args.min_travel
 
 
 for t1, t2 in itertools.combinations(args.cook_incompatible, 2):
@@ -553,35 +668,42 @@ for t1, t2 in itertools.combinations(args.cook_incompatible, 2):
 if args.large_teams > 0:
     large_team = LpVariable.dicts("largeTeam", teams, 0, 1, LpInteger)
 
-    prob += lpSum([large_team[t] for t in teams]) == args.large_teams
+    prob += LpAffineExpression((large_team[t], 1) for t in teams) == args.large_teams
     # two large teams must not meet
     for c in courses:
         for g in groups:
-            for t1 in teams:
-                for t2 in teams:
-                    if t1 != t2:
-                        prob += (
-                            assignment[(t1, g, c)]
-                            + assignment[(t2, g, c)]
-                            + large_team[t1]
-                            + large_team[t2]
-                            <= 3
-                        )
+            for t1, t2 in itertools.combinations(teams, 2):
+                prob += (
+                    assignment[(t1, g, c)]
+                    + assignment[(t2, g, c)]
+                    + large_team[t1]
+                    + large_team[t2]
+                    <= 3
+                )
 
 
 # teams with same address must not cook within the same course
 for addr, dup_teams in same_addr_team.items():
     if len(dup_teams) > 1:
         print("Forbidding same course of", len(dup_teams), "teams at", addr)
+        dup_chef = chef[[i.idx for i in dup_teams]]
+        cap = max(1, math.ceil(len(dup_teams) / len(courses)))
         for c in courses:
-            prob += lpSum(
-                [chef[(i["idx"], g, c)] for i in dup_teams for g in groups]
-            ) <= max(1, math.ceil(len(dup_teams) / len(courses)))
+            prob += LpAffineExpression((v, 1) for v in dup_chef[:, :, c].flat) <= cap
 
 
 solver = None
 if GUROBI_CMD().available():
-    solver = GUROBI_CMD(options=[("TimeLimit", args.timeout)], msg=1)
+    solver = GUROBI_CMD(
+        options=[
+            ("TimeLimit", args.timeout),
+            # focus on finding good solutions within the time limit
+            ("MIPFocus", 1),
+            ("Heuristics", 0.2),
+            ("Threads", os.cpu_count()),
+        ],
+        msg=1,
+    )
     # solver = GUROBI(timeLimit=args.timeout,msg=1)
     print("Loaded solver gurobi")
 elif CPLEX().available():
@@ -591,7 +713,16 @@ else:
     print(
         "Warning: Loaded fallback solver. Install Gurobi or CPLEX for better performance."
     )
-    solver = PULP_CBC_CMD(timeLimit=args.timeout, msg=1)
+    solver = PULP_CBC_CMD(
+        timeLimit=args.timeout,
+        gapRel=0.01,
+        threads=os.cpu_count(),
+        strong=10,
+        # PuLP's cuts=True would only enable the gomory, knapsack and probing cuts
+        # presolve, preprocessing and heuristics are on by default
+        options=["cuts on"],
+        msg=1,
+    )
 
 
 print(
@@ -609,8 +740,8 @@ if args.large_teams > 0:
     print("Large Team Info:")
     print("----------------")
     for t in teams:
-        if value(large_team[t]) == 1:
-            print(data[t]["name"], "is a large team")
+        if large_team[t].varValue >= 0.5:
+            print(data[t].name, "is a large team")
     print()
 
 
@@ -632,13 +763,13 @@ for c in courses:
         print("\tGroup %d" % g)
         mygroup = {"cook": None, "guests": []}
         for t in teams:
-            if value(assignment[(t, g, c)]) == 1:
-                if value(chef[(t, g, c)]) == 1:
+            if assignment[(t, g, c)].varValue >= 0.5:
+                if chef[(t, g, c)].varValue >= 0.5:
                     mygroup["cook"] = t
-                    print("\t\tChef %s" % data[t]["name"])
+                    print("\t\tChef %s" % data[t].name)
                 else:
                     mygroup["guests"].append(t)
-                    print("\t\tEat %s" % data[t]["name"])
+                    print("\t\tEat %s" % data[t].name)
         mycourse.append(mygroup)
     coursedata.append(mycourse)
 print()
@@ -650,78 +781,75 @@ teamdata = []
 for t in teams:
     obj = {
         "idx": t,
-        "name": data[t]["name"],
-        "tel": data[t]["tel"],
-        "diet": data[t]["diet"],
-        "address": data[t]["addr"],
+        "name": data[t].name,
+        "tel": data[t].tel,
+        "diet": data[t].diet,
+        "address": data[t].addr,
         "tour": [],
     }
     teamdata.append(obj)
 
+# arcs taken in the solution, per team
+tours = defaultdict(list)
+for t, g, c, j in visit_keys:
+    if c == courses[0] and visit[(t, g, c, j)].varValue >= 0.5:
+        tours[t].append((c, t, j))
+for c, i, j, t in arc_keys:
+    if arc[(c, i, j, t)].varValue >= 0.5:
+        tours[t].append((c, i, j))
+
 for t in teams:
-    print("Team %s" % (data[t]["name"]))
+    print("Team %s" % (data[t].name))
     sumdistance = 0
-    for c in courses:
-        for i in teams:
-            for j in teams:
-                for g in groups:
-                    if value(arc[(c, i, j, t, g)]) == 1:
-                        if value(chef[(t, g, c)]) == 1:
-                            print(
-                                "\tFor %s from %s to %s taking %d minutes and cook"
-                                % (
-                                    c,
-                                    data[i]["name"],
-                                    data[j]["name"],
-                                    distance_matrix[(i, j, c)],
-                                )
-                            )
-                            if not args.ignore_preferences:
-                                if c == 0:
-                                    if data[t]["pref1"] < 0:
-                                        print("\t\tAgainst preference")
-                                    elif data[t]["pref1"] > 0:
-                                        print("\t\tFollowing preference")
-                                if c == 1:
-                                    if data[t]["pref2"] < 0:
-                                        print("\t\tAgainst preference")
-                                    elif data[t]["pref2"] > 0:
-                                        print("\t\tFollowing preference")
-                                if c == 2:
-                                    if data[t]["pref3"] < 0:
-                                        print("\t\tAgainst preference")
-                                    elif data[t]["pref3"] > 0:
-                                        print("\t\tFollowing preference")
-
-                        else:
-                            print(
-                                "\tFor %s from %s to %s taking %d minutes"
-                                % (
-                                    c,
-                                    data[i]["name"],
-                                    data[j]["name"],
-                                    distance_matrix[(i, j, c)],
-                                )
-                            )
-
-                        teamdata[t]["tour"].append(
-                            {
-                                "approx_duration": distance_matrix[(i, j, c)],
-                                "group": g,
-                                "gang": c,
-                            }
-                        )
-
-                        sumdistance += distance_matrix[(i, j, c)]
-
-                        if c == courses[-1]:
-                            print(
-                                "\tFor Afterparty from %s taking %d minutes"
-                                % (data[j]["name"], distance_matrix[(j, "afterparty")])
-                            )
-                            du = distance_matrix[(j, "afterparty")]
-                            teamdata[t]["afterparty_duration"] = du
-                            sumdistance += du
+    for c, i, j in sorted(tours[t]):
+        for g in groups:
+            if assignment[(t, g, c)].varValue < 0.5:
+                continue
+            if chef[(t, g, c)].varValue >= 0.5:
+                print(
+                    "\tFor %s from %s to %s taking %d minutes and cook"
+                    % (
+                        c,
+                        data[i].name,
+                        data[j].name,
+                        distance_matrix[(i, j, c)],
+                    )
+                )
+                if not args.ignore_preferences:
+                    if pref[t, c] < 0:
+                        print("\t\tAgainst preference")
+                    elif pref[t, c] > 0:
+                        print("\t\tFollowing preference")
+
+            else:
+                print(
+                    "\tFor %s from %s to %s taking %d minutes"
+                    % (
+                        c,
+                        data[i].name,
+                        data[j].name,
+                        distance_matrix[(i, j, c)],
+                    )
+                )
+
+            teamdata[t]["tour"].append(
+                {
+                    "approx_duration": distance_matrix[(i, j, c)],
+                    "group": g,
+                    "gang": c,
+                }
+            )
+
+            sumdistance += distance_matrix[(i, j, c)]
+
+            if c == courses[-1]:
+                print(
+                    "\tFor Afterparty from %s taking %d minutes"
+                    % (data[j].name, distance_matrix[(j, "afterparty")])
+                )
+                du = distance_matrix[(j, "afterparty")]
+                teamdata[t]["afterparty_duration"] = du
+                sumdistance += du
     team_distances.append(sumdistance)
 
 print()
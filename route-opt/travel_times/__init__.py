@@ -1,22 +1,30 @@
 import datetime
 from math import radians, cos, sin, asin, sqrt
-from typing import TypeVar, Generic
+from typing import TypeVar, Generic, Tuple
 
-
-import os
-import percache
-import tempfile
+import numpy as np
 
 GeoPoint = TypeVar("GeoPoint")
 
-cache_path = os.path.join(tempfile.gettempdir(), "dinner-plan-cache")
-dinnerCache = percache.Cache(cache_path, livesync=True)
+# walking speed used to estimate short routes
+WALKING_MINUTES_PER_KM = 11
 
 
 class InterfaceTravelTimeEngine(Generic[GeoPoint]):
+    # routes may be requested in parallel, only for self-hosted servers
+    # rate limited public APIs are always queried one request at a time
+    parallel_routing: bool = False
+
+    # routes with a direct distance (km) below this are estimated as walks, not requested
+    walking_distance: float = 0
+
     def name(self) -> str:
         pass
 
+    def position(self, point: GeoPoint) -> Tuple[float, float]:
+        """(lat, lng) of a point returned by get_geo"""
+        pass
+
     def route_between_points(
         self, start: GeoPoint, dest: GeoPoint, time: datetime.datetime
     ) -> int:
@@ -41,3 +49,20 @@ def haversine(lon1, lat1, lon2, lat2):
     c = 2 * asin(sqrt(a))
     r = 6371  # Radius of earth in kilometers. Use 3956 for miles
     return c * r
+
+
+def haversine_matrix(lats, lons):
+    """
+    Great circle distances in km between all pairs of points,
+    vectorized version of haversine
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+
+    dlat = lats[None, :] - lats[:, None]
+    dlon = lons[None, :] - lons[:, None]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lats[:, None]) * np.cos(lats[None, :]) * np.sin(dlon / 2) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(a)) * 6371
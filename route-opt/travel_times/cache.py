@@ -0,0 +1,127 @@
+import atexit
+import functools
+import inspect
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+
+cache_path = os.path.join(tempfile.gettempdir(), "dinner-plan-cache.sqlite")
+
+
+class SqliteCache:
+    """
+    Persistent cache for travel time engine results.
+    Every cached method gets its own table, rows are keyed by the
+    parameters that actually affect the answer.
+    """
+
+    def __init__(self, path: str, commit_every: int = 100):
+        self.path = path
+        self.commit_every = commit_every
+        self._lock = threading.Lock()
+        self._conn = None
+        self._tables = set()
+        self._pending = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            atexit.register(self.commit)
+        return self._conn
+
+    def _table(self, table: str) -> str:
+        if table not in self._tables:
+            self._connection().execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB)"
+            )
+            self._tables.add(table)
+        return table
+
+    def get(self, table: str, key: str):
+        """Returns the cached value or None"""
+        with self._lock:
+            row = (
+                self._connection()
+                .execute(
+                    f"SELECT value FROM {self._table(table)} WHERE key = ?", (key,)
+                )
+                .fetchone()
+            )
+        return None if row is None else pickle.loads(row[0])
+
+    def set(self, table: str, key: str, value):
+        with self._lock:
+            self._connection().execute(
+                f"INSERT OR REPLACE INTO {self._table(table)} (key, value) VALUES (?, ?)",
+                (key, pickle.dumps(value)),
+            )
+            # writes are committed in batches, see commit()
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def commit(self):
+        with self._lock:
+            if self._conn is not None and self._pending > 0:
+                self._conn.commit()
+                self._pending = 0
+
+
+dinnerCache = SqliteCache(cache_path)
+
+
+def sqlite_cache(table: str, key=None):
+    """
+    Decorator caching an engine method in `table`.
+    `key` is called with the arguments of the method (without self, defaults applied)
+    and returns a tuple, by default all arguments are used.
+    The repr of the engine is part of the key, so engines do not share entries.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(list(bound.arguments.items())[1:])
+            if key is None:
+                params = tuple(params.values())
+            else:
+                params = key(**params)
+            cache_key = repr((repr(self),) + tuple(params))
+
+            result = dinnerCache.get(table, cache_key)
+            if result is None:
+                result = func(self, *args, **kwargs)
+                dinnerCache.set(table, cache_key, result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def round_pos(lat: float, lng: float):
+    """Rounds a position to ~1m, which is plenty for routing"""
+    return (round(lat, 5), round(lng, 5))
+
+
+# departure times within the same bucket share cached routes
+TIME_BUCKET_MINUTES = 15
+
+
+def time_bucket(time) -> str:
+    """
+    Weekday and time of day, rounded down to TIME_BUCKET_MINUTES.
+    Re-runs for another date of the same weekday or a slightly shifted
+    event time hit the cache.
+    """
+    minute = time.minute // TIME_BUCKET_MINUTES * TIME_BUCKET_MINUTES
+    return time.replace(minute=minute, second=0, microsecond=0).strftime("%w %H%M")
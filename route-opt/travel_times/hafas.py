@@ -1,5 +1,5 @@
-from travel_times import InterfaceTravelTimeEngine, haversine
-from travel_times import dinnerCache
+from travel_times import InterfaceTravelTimeEngine, haversine, WALKING_MINUTES_PER_KM
+from travel_times.cache import sqlite_cache, round_pos, time_bucket
 
 from pyhafas import HafasClient
 from pyhafas.profile import DBProfile
@@ -10,7 +10,17 @@ from ratelimiter import RateLimiter
 import datetime
 
 
+def _route_key(start: Station, dest: Station, time: datetime.datetime):
+    return (
+        round_pos(start.latitude, start.longitude)
+        + round_pos(dest.latitude, dest.longitude)
+        + (time_bucket(time),)
+    )
+
+
 class HafasTravelTimeEngine(InterfaceTravelTimeEngine[Station]):
+    walking_distance = 0.8
+
     def __init__(self):
         self.hafas_client = HafasClient(DBProfile())
 
@@ -18,10 +28,10 @@ class HafasTravelTimeEngine(InterfaceTravelTimeEngine[Station]):
         return "HafasClient"
 
     def __repr__(self):
-        # required for percache
+        # used as cache namespace
         return "HafasTravelEngine"
 
-    @dinnerCache
+    @sqlite_cache("route", key=_route_key)
     @RateLimiter(max_calls=1, period=20)
     def route_between_points(
         self,
@@ -32,8 +42,8 @@ class HafasTravelTimeEngine(InterfaceTravelTimeEngine[Station]):
         direct_distance = haversine(
             start.longitude, start.latitude, dest.longitude, dest.latitude
         )
-        if direct_distance < 0.8:
-            return direct_distance * 11
+        if direct_distance < self.walking_distance:
+            return direct_distance * WALKING_MINUTES_PER_KM
 
         if start.lid == dest.lid:
             return 0
@@ -41,7 +51,10 @@ class HafasTravelTimeEngine(InterfaceTravelTimeEngine[Station]):
         route = routes[0]
         return int(route.duration.seconds / 60)
 
-    @dinnerCache
+    def position(self, point: Station):
+        return (point.latitude, point.longitude)
+
+    @sqlite_cache("geo")
     @RateLimiter(max_calls=1, period=10)
     def get_geo(self, address: str) -> Station:
         results = self.hafas_client.locations(address, "ALL")
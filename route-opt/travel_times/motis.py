@@ -1,14 +1,13 @@
 from travel_times import InterfaceTravelTimeEngine
-from travel_times import dinnerCache
+from travel_times.cache import sqlite_cache, round_pos, time_bucket
 
 from ratelimiter import RateLimiter
-from requests import post
+import requests
+from requests.adapters import HTTPAdapter
 from geocoder import osm as osm_geocode
 
 from typing import TypedDict, Tuple, Any
 
-import json
-
 import datetime
 
 
@@ -17,18 +16,28 @@ class OsmPoint(TypedDict):
     osm: Any
 
 
+def _route_key(start: OsmPoint, dest: OsmPoint, time: datetime.datetime):
+    return round_pos(*start["pos"]) + round_pos(*dest["pos"]) + (time_bucket(time),)
+
+
 class MotisTravelTimeEngine(InterfaceTravelTimeEngine[OsmPoint]):
-    def __init__(self):
-        pass
+    # routes come from the self-hosted server on localhost
+    parallel_routing = True
+
+    def __init__(self, workers: int = 16):
+        # keep connections to the server alive, one for each parallel route request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=workers, max_retries=3)
+        self.session.mount("http://", adapter)
 
     def name(self):
         return "MotisClient"
 
     def __repr__(self):
-        # required for percache
+        # used as cache namespace
         return "MotisTravelEngine"
 
-    @dinnerCache
+    @sqlite_cache("route", key=_route_key)
     def route_between_points(
         self,
         start: OsmPoint,
@@ -87,7 +96,7 @@ class MotisTravelTimeEngine(InterfaceTravelTimeEngine[OsmPoint]):
 
         # must rate limit if not self-hostet
         url = "http://localhost:8080/"
-        result_json = post(url, data=json.dumps(request_data)).json()
+        result_json = self.session.post(url, json=request_data, timeout=30).json()
 
         trip = result_json["content"]["connections"][-1]
         start_time = datetime.datetime.fromtimestamp(
@@ -100,7 +109,10 @@ class MotisTravelTimeEngine(InterfaceTravelTimeEngine[OsmPoint]):
         duration = dest_time - start_time
         return int(duration.total_seconds() / 60)
 
-    @dinnerCache
+    def position(self, point: OsmPoint):
+        return point["pos"]
+
+    @sqlite_cache("geo")
     @RateLimiter(max_calls=1, period=1)
     def get_geo(self, address: str) -> OsmPoint:
         geo = osm_geocode(address)
@@ -1,12 +1,13 @@
 from travel_times import InterfaceTravelTimeEngine
-from travel_times import dinnerCache
+from travel_times.cache import sqlite_cache, round_pos
 
 import datetime
 import geocoder
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from typing import TypedDict, Tuple, Any
+from typing import TypedDict, Tuple, Any, List
 from ratelimiter import RateLimiter
 
 
@@ -15,12 +16,30 @@ class OsrmPoint(TypedDict):
     osm: Any
 
 
+def _route_key(start: OsrmPoint, dest: OsrmPoint, time: datetime.datetime):
+    # driving times do not depend on the departure time
+    return round_pos(*start["pos"]) + round_pos(*dest["pos"])
+
+
+def _matrix_key(points: List[OsrmPoint], time: datetime.datetime):
+    return tuple(round_pos(*p["pos"]) for p in points)
+
+
 class OsrmTravelTimeEngine(InterfaceTravelTimeEngine[OsrmPoint]):
+    # routes come from the self-hosted server on localhost
+    parallel_routing = True
+
+    def __init__(self, workers: int = 16):
+        # keep connections to the server alive, one for each parallel route request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=workers, max_retries=3)
+        self.session.mount("http://", adapter)
+
     def __repr__(self):
-        # required for percache
+        # used as cache namespace
         return "OsrmTravelEngine"
 
-    @dinnerCache
+    @sqlite_cache("route", key=_route_key)
     def route_between_points(
         self,
         start: OsrmPoint,
@@ -28,13 +47,28 @@ class OsrmTravelTimeEngine(InterfaceTravelTimeEngine[OsrmPoint]):
         time: datetime.datetime = datetime.datetime.now(),
     ) -> int:
         url = f"http://localhost:5000/route/v1/driving/{start['pos'][1]},{start['pos'][0]};{dest['pos'][1]},{dest['pos'][0]}?overview=false"
-        result_json = requests.get(url).json()
+        result_json = self.session.get(url, timeout=30).json()
         return int(result_json["routes"][0]["duration"] / 60)
 
+    @sqlite_cache("matrix", key=_matrix_key)
+    def route_matrix(
+        self,
+        points: List[OsrmPoint],
+        time: datetime.datetime = datetime.datetime.now(),
+    ) -> List[List[int]]:
+        """Durations between all points, using a single /table request"""
+        coords = ";".join(f"{p['pos'][1]},{p['pos'][0]}" for p in points)
+        url = f"http://localhost:5000/table/v1/driving/{coords}?annotations=duration"
+        result_json = self.session.get(url, timeout=30).json()
+        return [[int(d / 60) for d in row] for row in result_json["durations"]]
+
     def name(self):
         return "Osrm"
 
-    @dinnerCache
+    def position(self, point: OsrmPoint):
+        return point["pos"]
+
+    @sqlite_cache("geo")
     @RateLimiter(max_calls=1, period=1)
     def get_geo(self, address: str) -> OsrmPoint:
         geo = geocoder.osm(address)